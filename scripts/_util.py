@@ -0,0 +1,58 @@
+"""
+Helpers shared by the StrikeSense asset scripts (model download and TTS
+audio generation).
+"""
+
+import threading
+from pathlib import Path
+
+# Every audio cue the timer plays: (spoken text, output filename, duration limit in seconds)
+AUDIO_CUES = (
+    # Core timer events
+    ("Round start", "round_start", 1.0),
+    ("Round end", "round_end", 1.0),
+    ("Timer complete", "timer_complete", 1.5),
+
+    # Work/Rest periods
+    ("Work period", "work_start", 1.0),
+    ("Rest period", "rest_start", 1.0),
+
+    # Timer controls
+    ("Timer paused", "pause", 0.8),
+    ("Timer resumed", "resume", 0.8),
+
+    # Warnings and countdown
+    ("Warning", "warning", 0.8),
+    ("Countdown", "countdown", 0.5),
+)
+
+# Longer clip used to check voice quality by ear
+TEST_AUDIO_CUE = (
+    "StrikeSense timer audio test. All systems working correctly.",
+    "test_audio",
+    3.0,
+)
+
+# Serializes console output from concurrent workers
+_print_lock = threading.Lock()
+
+
+def log(*args, **kwargs):
+    """Print without interleaving lines from other worker threads."""
+    with _print_lock:
+        print(*args, **kwargs, flush=True)
+
+
+def ensure_dir(path):
+    """Create path (and any parents) if needed and return it as a Path."""
+    path = Path(path)
+    path.mkdir(parents=True, exist_ok=True)
+    return path
+
+
+def print_generated_files(output_dir):
+    """List the generated .wav files in output_dir with their sizes."""
+    print("\nGenerated files:")
+    for file_path in sorted(Path(output_dir).glob("*.wav")):
+        file_size = file_path.stat().st_size
+        print(f"  {file_path.name} ({file_size:,} bytes)")
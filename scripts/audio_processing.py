@@ -0,0 +1,177 @@
+"""
+In-process audio post-processing for the StrikeSense TTS generators.
+
+Turns raw TTS output into the cue format shipped with the app (16-bit mono
+PCM WAV, 22.05 kHz by default) using numpy and the stdlib 'wave' module, so no
+ffmpeg process is spawned for the common WAV case.
+"""
+
+import functools
+import io
+import os
+import wave
+
+import numpy as np
+
+# Output format of the generated cues. Short spoken cues stay intelligible
+# at 22.05 kHz, which halves their size and decode cost compared to 44.1 kHz.
+DEFAULT_FRAME_RATE = 22050
+TARGET_SAMPLE_WIDTH = 2  # bytes (16-bit PCM)
+
+# Fade applied to both ends of a cue, and the minimum length that gets one
+FADE_MS = 50
+MIN_FADE_LENGTH_MS = 200
+
+# Peak level after normalization, matching pydub's default 0.1 dB headroom
+NORMALIZE_HEADROOM_DB = 0.1
+
+
+def _pcm_to_float(raw, sample_width, channels):
+    """Convert interleaved PCM bytes into a float32 (frames, channels) array in [-1, 1]."""
+    if sample_width == 1:
+        # 8-bit WAV is unsigned
+        samples = (np.frombuffer(raw, dtype=np.uint8).astype(np.float32) - 128.0) / 128.0
+    elif sample_width == 2:
+        samples = np.frombuffer(raw, dtype='<i2').astype(np.float32) / 32768.0
+    elif sample_width == 3:
+        padded = np.frombuffer(raw, dtype=np.uint8).reshape(-1, 3)
+        as_int = (padded[:, 0].astype(np.int32)
+                  | (padded[:, 1].astype(np.int32) << 8)
+                  | (padded[:, 2].astype(np.int32) << 16))
+        as_int = np.where(as_int & 0x800000, as_int - (1 << 24), as_int)
+        samples = as_int.astype(np.float32) / float(1 << 23)
+    elif sample_width == 4:
+        samples = np.frombuffer(raw, dtype='<i4').astype(np.float32) / float(1 << 31)
+    else:
+        raise ValueError(f"Unsupported sample width: {sample_width} bytes")
+
+    frames = len(samples) // channels
+    return samples[:frames * channels].reshape(frames, channels)
+
+
+def _decode_with_pydub(source):
+    """Decode formats the 'wave' module can't read (e.g. AIFF) through pydub/ffmpeg."""
+    from pydub import AudioSegment
+
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+    segment = AudioSegment.from_file(source)
+    samples = _pcm_to_float(segment.raw_data, segment.sample_width, segment.channels)
+    return samples, segment.frame_rate
+
+
+def load_audio(source):
+    """
+    Decode TTS output into float samples.
+
+    Args:
+        source: Path to an audio file, or the file's contents as bytes
+
+    Returns:
+        Tuple of (float32 array shaped (frames, channels), frame rate)
+    """
+    wav_source = io.BytesIO(source) if isinstance(source, (bytes, bytearray)) else str(source)
+    try:
+        with wave.open(wav_source, 'rb') as wav_file:
+            channels = wav_file.getnchannels()
+            sample_width = wav_file.getsampwidth()
+            frame_rate = wav_file.getframerate()
+            raw = wav_file.readframes(wav_file.getnframes())
+    except (wave.Error, EOFError):
+        return _decode_with_pydub(source)
+
+    # Streamed WAVs (e.g. 'say' writing to a pipe) may carry a bogus frame
+    # count, in which case readframes() already returned everything there is
+    return _pcm_to_float(raw, sample_width, channels), frame_rate
+
+
+@functools.lru_cache(maxsize=None)
+def _fade_ramp(frame_rate):
+    """Linear 0..1 fade-in ramp of FADE_MS at frame_rate, shared by every cue."""
+    ramp = np.linspace(0.0, 1.0, frame_rate * FADE_MS // 1000, dtype=np.float32)
+    ramp.flags.writeable = False
+    return ramp
+
+
+def process_cue(samples, frame_rate, duration_limit=None, target_rate=DEFAULT_FRAME_RATE):
+    """
+    Normalize, trim, downmix, resample and fade a decoded cue.
+
+    Args:
+        samples: float32 array shaped (frames, channels) as returned by load_audio
+        frame_rate: Frame rate of samples
+        duration_limit: Maximum duration in seconds (optional)
+        target_rate: Frame rate of the returned cue
+
+    Returns:
+        int16 mono array at target_rate
+    """
+    # Convert to mono
+    mono = samples.mean(axis=1) if samples.ndim == 2 else samples
+
+    # Apply duration limit if specified
+    if duration_limit:
+        mono = mono[:int(duration_limit * frame_rate)]
+
+    # Normalize audio levels. Resampling and fading only scale samples, so
+    # the gain is folded into the final quantization multiply below instead
+    # of rescaling the whole cue here; max/min avoid an np.abs temporary.
+    gain = 1.0
+    if len(mono):
+        peak = max(float(mono.max()), -float(mono.min()))
+        if peak > 0:
+            gain = 10 ** (-NORMALIZE_HEADROOM_DB / 20) / peak
+
+    # Resample to the target rate with linear interpolation
+    if frame_rate != target_rate and len(mono):
+        out_frames = int(round(len(mono) * target_rate / frame_rate))
+        src_times = np.arange(len(mono)) / frame_rate
+        dst_times = np.arange(out_frames) / target_rate
+        mono = np.interp(dst_times, src_times, mono)
+
+    # Apply fade in/out for smoother playback, multiplying in place
+    if len(mono) * 1000 > MIN_FADE_LENGTH_MS * target_rate:
+        ramp = _fade_ramp(target_rate)
+        fade_frames = len(ramp)
+        mono = np.array(mono, dtype=np.float32)
+        np.multiply(mono[:fade_frames], ramp, out=mono[:fade_frames])
+        np.multiply(mono[-fade_frames:], ramp[::-1], out=mono[-fade_frames:])
+
+    scaled = mono * (32767.0 * gain)
+    np.rint(scaled, out=scaled)
+    np.clip(scaled, -32768, 32767, out=scaled)
+    return scaled.astype(np.int16)
+
+
+def remove_temp_file(path):
+    """
+    Delete a raw TTS temp file, first hinting the kernel to drop its pages.
+
+    The file is read exactly once, so caching it only evicts pages that are
+    still useful. The hint is a no-op where posix_fadvise is unavailable
+    (macOS, Windows).
+    """
+    if not os.path.exists(path):
+        return
+    if hasattr(os, 'posix_fadvise'):
+        try:
+            fd = os.open(path, os.O_RDONLY)
+            try:
+                os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+            finally:
+                os.close(fd)
+        except OSError:
+            pass
+    os.unlink(path)
+
+
+def write_wav(path, samples, frame_rate=DEFAULT_FRAME_RATE):
+    """Write int16 mono samples as a PCM WAV file."""
+    with wave.open(str(path), 'wb') as wav_file:
+        wav_file.setparams((1, TARGET_SAMPLE_WIDTH, frame_rate, 0, 'NONE', 'not compressed'))
+        wav_file.writeframes(samples.astype('<i2').tobytes())
+
+
+def duration_seconds(samples, frame_rate=DEFAULT_FRAME_RATE):
+    """Length of a processed cue in seconds."""
+    return len(samples) / frame_rate
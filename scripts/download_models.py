@@ -4,58 +4,300 @@ Script to download pose estimation models for StrikeSense app.
 Downloads MoveNet Lightning and BlazePose models from TensorFlow Hub.
 """
 
+import hashlib
+import mmap
 import os
+import shutil
 import sys
-import urllib.request
-import urllib.error
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 
+import urllib3
+
+from _util import ensure_dir, log
+
 # Model URLs and configurations
+# 'sha256' pins the expected file contents. When set, an existing file that
+# matches is kept without prompting and a fresh download must match it. Leave
+# it as None until pinned; the downloader prints the hash of each file it fetches.
 MODELS = {
     'movenet_lightning': {
         'url': 'https://tfhub.dev/google/movenet/singlepose/lightning/4?tf-hub-format=compressed',
         'filename': 'movenet_lightning.tflite',
-        'description': 'MoveNet Lightning - Fast single pose detection'
+        'description': 'MoveNet Lightning - Fast single pose detection',
+        'sha256': None,
     },
     'blazepose_lite': {
         'url': 'https://tfhub.dev/mediapipe/tfjs-model/blazepose_3dpose/1?tf-hub-format=compressed',
         'filename': 'blazepose_lite.tflite',
-        'description': 'BlazePose Lite - Balanced speed and accuracy'
+        'description': 'BlazePose Lite - Balanced speed and accuracy',
+        'sha256': None,
     },
     'blazepose_full': {
         'url': 'https://tfhub.dev/mediapipe/tfjs-model/blazepose_3dpose/1?tf-hub-format=compressed',
         'filename': 'blazepose_full.tflite',
-        'description': 'BlazePose Full - High accuracy pose detection'
+        'description': 'BlazePose Full - High accuracy pose detection',
+        'sha256': None,
     }
 }
 
-def download_file(url: str, filepath: Path, description: str) -> bool:
-    """Download a file from URL to filepath."""
+# Shared connection pool so every download reuses sockets and TLS sessions.
+# Pools are keyed per host, so models served from the same host (tfhub.dev)
+# reuse one resolved, already-handshaken connection. Build it once and never
+# send 'Connection: close'.
+_POOL = urllib3.PoolManager(
+    num_pools=4,
+    maxsize=4,
+    block=False,
+    headers={'Connection': 'keep-alive', 'User-Agent': 'StrikeSense/1.0'},
+    retries=urllib3.Retry(total=5, backoff_factor=0.3),
+)
+
+# Attempts per model when a transfer drops mid-stream; each retry resumes the
+# .part file. Connection failures are retried by the pool's Retry only.
+_MAX_ATTEMPTS = 3
+_RETRY_BACKOFF = 1.0  # seconds, doubled after every failed attempt
+
+# Network read / disk write size, and the minimum interval between progress lines
+_CHUNK_SIZE = 1 << 20
+_PROGRESS_INTERVAL = 0.25  # seconds
+
+def _headers(extra: dict) -> dict:
+    """Pool default headers plus extra; a per-request headers= replaces the defaults."""
+    return {**_POOL.headers, **extra}
+
+def _part_path(filepath: Path) -> Path:
+    """Where bytes land while downloading, so an interrupted run can resume."""
+    return filepath.with_name(filepath.name + '.part')
+
+def _etag_path(filepath: Path) -> Path:
+    """Sidecar holding the server ETag of the downloaded (or partial) file."""
+    return filepath.with_name(filepath.name + '.etag')
+
+def _discard_part(part_path: Path) -> None:
+    """Delete a partial download and the ETag it was started from."""
+    part_path.unlink(missing_ok=True)
+    _etag_path(part_path).unlink(missing_ok=True)
+
+def _read_etag(filepath: Path):
+    """Return the stored ETag for filepath, or None if there isn't one."""
+    etag_path = _etag_path(filepath)
+    if not filepath.exists() or not etag_path.exists():
+        return None
+    return etag_path.read_text().strip() or None
+
+def _discard_etag(filepath: Path) -> None:
+    """
+    Forget the stored ETag so the next download is unconditional.
+    
+    Used when the local file is known to be bad: a conditional GET would
+    get a 304 back and keep it.
+    """
+    _etag_path(filepath).unlink(missing_ok=True)
+
+def _remote_matches(url: str, filepath: Path):
+    """
+    Compare an existing file against the server with a HEAD request.
+    
+    Returns True if the remote Content-Length (and ETag, when both sides have
+    one) match the local copy, False if they differ, and None if the server
+    gave no usable answer.
+    """
+    try:
+        response = _POOL.request('HEAD', url, redirect=True, headers=_headers({'Accept-Encoding': 'identity'}))
+    except urllib3.exceptions.HTTPError:
+        return None
+    if response.status != 200 or 'Content-Length' not in response.headers:
+        return None
+    
     try:
-        print(f"Downloading {description}...")
-        print(f"URL: {url}")
-        print(f"Destination: {filepath}")
+        remote_size = int(response.headers['Content-Length'])
+    except ValueError:
+        return None
+    if remote_size != filepath.stat().st_size:
+        return False
+    local_etag = _read_etag(filepath)
+    remote_etag = response.headers.get('ETag')
+    if local_etag and remote_etag:
+        return local_etag == remote_etag
+    return True
+
+def _stream_to_part(url: str, filepath: Path, description: str) -> bool:
+    """
+    Stream url into the .part file for filepath, resuming after any bytes
+    already written, and move it into place once complete.
+    
+    Returns False for a non-retryable HTTP status. Connection errors raised
+    mid-stream propagate so the caller can retry from the new offset.
+    """
+    part_path = _part_path(filepath)
+    start = part_path.stat().st_size if part_path.exists() else 0
+    headers = {'Accept-Encoding': 'identity'}
+    if start:
+        headers['Range'] = f'bytes={start}-'
+        # Only resume if the server still has the version the part came from;
+        # otherwise it answers 200 with the whole new body
+        part_etag_path = _etag_path(part_path)
+        part_etag = part_etag_path.read_text().strip() if part_etag_path.exists() else ''
+        if part_etag and not part_etag.startswith('W/'):
+            headers['If-Range'] = part_etag
+    else:
+        # Let the server confirm an existing copy is current without sending the body
+        etag = _read_etag(filepath)
+        if etag:
+            headers['If-None-Match'] = etag
+    
+    response = _POOL.request('GET', url, preload_content=False, headers=_headers(headers))
+    try:
+        if response.status == 304:
+            log(f"\n✅ {filepath.name} not modified on server, keeping existing file")
+            return True
         
-        # Create directory if it doesn't exist
-        filepath.parent.mkdir(parents=True, exist_ok=True)
+        if response.status == 416:
+            # The part file already holds the whole body, or is stale
+            content_range = response.headers.get('Content-Range', '')
+            if not content_range.endswith(f'/{start}'):
+                _discard_part(part_path)
+                raise urllib3.exceptions.HTTPError(f"HTTP 416 resuming at byte {start}, restarting")
+        else:
+            if response.status == 206:
+                # Never splice bytes from a different offset onto the part file
+                content_range = response.headers.get('Content-Range', '')
+                if not content_range.startswith(f'bytes {start}-'):
+                    _discard_part(part_path)
+                    raise urllib3.exceptions.HTTPError(
+                        f"HTTP 206 with Content-Range {content_range!r} resuming at byte {start}, restarting")
+                mode = 'ab'
+                downloaded = start
+                log(f"Resuming {part_path.name} at {start} bytes")
+            elif response.status == 200:
+                # Fresh start, or the server ignored the Range header or the
+                # file changed since the part was written: start over
+                mode = 'wb'
+                downloaded = 0
+                etag = response.headers.get('ETag')
+                if etag:
+                    _etag_path(part_path).write_text(etag)
+                else:
+                    _etag_path(part_path).unlink(missing_ok=True)
+            else:
+                log(f"\n❌ Failed to download {description}: HTTP {response.status}")
+                return False
+            
+            total_size = downloaded + int(response.headers.get('Content-Length', 0))
+            
+            # Report progress at most every 1% or _PROGRESS_INTERVAL seconds
+            report_step = max(1, total_size // 100)
+            last_reported = downloaded
+            last_report_time = time.monotonic()
+            
+            def report_progress():
+                if total_size > 0:
+                    percent = min(100, (downloaded * 100) // total_size)
+                    log(f"\r{part_path.name}: {percent}% ({downloaded}/{total_size} bytes)", end='')
+            
+            # Chunks are already 1 MiB, so skip Python's write buffer
+            with open(part_path, mode, buffering=0) as f:
+                while True:
+                    chunk = response.read(_CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    f.write(chunk)
+                    downloaded += len(chunk)
+                    
+                    now = time.monotonic()
+                    if downloaded - last_reported >= report_step or now - last_report_time > _PROGRESS_INTERVAL:
+                        report_progress()
+                        last_reported = downloaded
+                        last_report_time = now
+            
+            if downloaded != last_reported:
+                report_progress()
+        
+        part_path.replace(filepath)
         
-        # Download with progress
-        def progress_hook(block_num, block_size, total_size):
-            downloaded = block_num * block_size
-            if total_size > 0:
-                percent = min(100, (downloaded * 100) // total_size)
-                print(f"\rProgress: {percent}% ({downloaded}/{total_size} bytes)", end='')
+        # Remember the ETag so the next run can send If-None-Match; a 416 for
+        # an already complete part may not carry one, so fall back to the part's
+        part_etag_path = _etag_path(part_path)
+        etag = response.headers.get('ETag')
+        if etag:
+            _etag_path(filepath).write_text(etag)
+            part_etag_path.unlink(missing_ok=True)
+        elif part_etag_path.exists():
+            part_etag_path.replace(_etag_path(filepath))
+        else:
+            _etag_path(filepath).unlink(missing_ok=True)
         
-        urllib.request.urlretrieve(url, filepath, progress_hook)
-        print(f"\n✅ Successfully downloaded {filepath.name}")
+        log(f"\n✅ Successfully downloaded {filepath.name}")
         return True
+    finally:
+        response.release_conn()
+
+def download_file(url: str, filepath: Path, description: str) -> bool:
+    """Download a file from URL to filepath, resuming interrupted transfers."""
+    try:
+        log(f"Downloading {description}...")
+        log(f"URL: {url}")
+        log(f"Destination: {filepath}")
+        
+        # Create directory if it doesn't exist
+        ensure_dir(filepath.parent)
+        
+        for attempt in range(1, _MAX_ATTEMPTS + 1):
+            try:
+                return _stream_to_part(url, filepath, description)
+            except urllib3.exceptions.MaxRetryError:
+                # The pool already retried the connection with backoff
+                raise
+            except urllib3.exceptions.HTTPError as e:
+                if attempt == _MAX_ATTEMPTS:
+                    raise
+                delay = _RETRY_BACKOFF * (2 ** (attempt - 1))
+                log(f"\n⚠️  {filepath.name}: {e} - retrying in {delay:.1f}s (attempt {attempt + 1}/{_MAX_ATTEMPTS})")
+                time.sleep(delay)
         
-    except urllib.error.URLError as e:
-        print(f"\n❌ Failed to download {description}: {e}")
+    except urllib3.exceptions.HTTPError as e:
+        log(f"\n❌ Failed to download {description}: {e}")
         return False
     except Exception as e:
-        print(f"\n❌ Unexpected error downloading {description}: {e}")
+        log(f"\n❌ Unexpected error downloading {description}: {e}")
+        return False
+
+def _sha256(filepath: Path) -> str:
+    """Hash a file by mapping it into memory rather than reading it in chunks."""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            return digest.hexdigest()
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            digest.update(mm)
+    return digest.hexdigest()
+
+def _verify(filepath: Path, expected: str) -> bool:
+    """Return True if filepath exists and its SHA-256 matches expected."""
+    if not filepath.exists():
         return False
+    return _sha256(filepath) == expected.lower()
+
+def _prewarm_connections(urls) -> threading.Thread:
+    """
+    Open a connection to each host in the background so DNS and the TLS
+    handshake overlap with the interactive prompts instead of the first GET.
+    """
+    origins = sorted({f"{u.scheme}://{u.netloc}/" for u in map(urllib3.util.parse_url, urls)})
+    
+    def warm():
+        for origin in origins:
+            try:
+                _POOL.request('HEAD', origin, redirect=False, retries=False, timeout=5.0)
+            except urllib3.exceptions.HTTPError:
+                pass  # Best effort; the real download reports any errors
+    
+    thread = threading.Thread(target=warm, daemon=True)
+    thread.start()
+    return thread
 
 def get_file_size(filepath: Path) -> str:
     """Get human-readable file size."""
@@ -66,6 +308,38 @@ def get_file_size(filepath: Path) -> str:
         size /= 1024.0
     return f"{size:.1f} TB"
 
+def _fetch_one(model_name: str, model_info: dict, assets_dir: Path) -> bool:
+    """Download a single model and report its size. Safe to run in a worker thread."""
+    log(f"\n📦 Processing {model_name}...")
+    log(f"Description: {model_info['description']}")
+    
+    filepath = assets_dir / model_info['filename']
+    
+    # Download the model
+    if download_file(model_info['url'], filepath, model_info['description']):
+        if filepath.exists():
+            log(f"   {filepath.name} size: {get_file_size(filepath)}")
+            digest = _sha256(filepath)
+            expected = model_info.get('sha256')
+            if expected and digest != expected.lower():
+                log(f"   ❌ Checksum mismatch for {filepath.name}: expected {expected}, got {digest}")
+                filepath.unlink()
+                return False
+            log(f"   {filepath.name} sha256: {digest}")
+            return True
+        log(f"   ❌ File was not created: {filepath.name}")
+    else:
+        log(f"   ❌ Failed to download {model_name}")
+    return False
+
+def _link_or_copy(source: Path, dest: Path) -> None:
+    """Hardlink source to dest, copying instead when a link isn't possible."""
+    dest.unlink(missing_ok=True)
+    try:
+        os.link(source, dest)
+    except OSError:
+        shutil.copyfile(source, dest)
+
 def create_mock_models(assets_dir: Path) -> None:
     """Create mock model files for testing when real models can't be downloaded."""
     print("\n📝 Creating mock model files for testing...")
@@ -95,37 +369,97 @@ def main():
     print(f"Project root: {project_root}")
     print(f"Assets directory: {assets_dir}")
     
+    _prewarm_connections(model_info['url'] for model_info in MODELS.values())
+    
     # Create assets directory if it doesn't exist
-    assets_dir.mkdir(parents=True, exist_ok=True)
+    ensure_dir(assets_dir)
     
     success_count = 0
     total_count = len(MODELS)
     
+    # Ask about existing files up front so the downloads can run unattended
+    pending = []
+    verified = {}  # url -> existing file known to match the server copy
     for model_name, model_info in MODELS.items():
-        print(f"\n📦 Processing {model_name}...")
-        print(f"Description: {model_info['description']}")
-        
         filepath = assets_dir / model_info['filename']
         
+        # Keep an existing file whose contents match the pinned checksum
+        expected = model_info.get('sha256')
+        if expected and filepath.exists():
+            if _verify(filepath, expected):
+                print(f"\n✅ {filepath.name} is up to date (sha256 verified), skipping...")
+                verified.setdefault(model_info['url'], filepath)
+                success_count += 1
+                continue
+            print(f"\n⚠️  {filepath.name} does not match its checksum, downloading again")
+            _discard_etag(filepath)
+            pending.append((model_name, model_info))
+            continue
+        
+        # Skip the download when the server reports the same size (and ETag)
+        if filepath.exists():
+            remote_matches = _remote_matches(model_info['url'], filepath)
+            if remote_matches:
+                print(f"\n✅ {filepath.name} matches the server copy, skipping...")
+                verified.setdefault(model_info['url'], filepath)
+                success_count += 1
+                continue
+            if remote_matches is False:
+                print(f"\n⚠️  {filepath.name} differs from the server copy, downloading again")
+                _discard_etag(filepath)
+                pending.append((model_name, model_info))
+                continue
+        
         # Check if file already exists
         if filepath.exists():
-            print(f"⚠️  File already exists: {filepath.name}")
+            print(f"\n⚠️  File already exists: {filepath.name}")
             print(f"   Size: {get_file_size(filepath)}")
             response = input("   Download anyway? (y/N): ").strip().lower()
             if response != 'y':
                 print("   Skipping...")
                 success_count += 1
                 continue
+            _discard_etag(filepath)
         
-        # Download the model
-        if download_file(model_info['url'], filepath, model_info['description']):
-            if filepath.exists():
-                print(f"   Size: {get_file_size(filepath)}")
-                success_count += 1
-            else:
-                print("   ❌ File was not created")
+        pending.append((model_name, model_info))
+    
+    # Models that share a URL are fetched once and linked to the other destinations
+    url_to_first_dest = dict(verified)
+    downloads = []
+    duplicates = []
+    for model_name, model_info in pending:
+        filepath = assets_dir / model_info['filename']
+        first_dest = url_to_first_dest.setdefault(model_info['url'], filepath)
+        if first_dest == filepath:
+            downloads.append((model_name, model_info))
         else:
-            print(f"   ❌ Failed to download {model_name}")
+            duplicates.append((model_name, filepath, first_dest))
+    
+    # Downloads are network/disk bound, so run them concurrently over the shared pool
+    available = set(verified.values())
+    if downloads:
+        with ThreadPoolExecutor(max_workers=len(downloads)) as executor:
+            futures = {
+                executor.submit(_fetch_one, model_name, model_info, assets_dir):
+                    assets_dir / model_info['filename']
+                for model_name, model_info in downloads
+            }
+            for future in as_completed(futures):
+                if future.result():
+                    available.add(futures[future])
+                    success_count += 1
+    
+    for model_name, filepath, first_dest in duplicates:
+        if first_dest not in available:
+            print(f"\n❌ Failed to download {model_name}: {first_dest.name} is unavailable")
+            continue
+        try:
+            _link_or_copy(first_dest, filepath)
+        except OSError as e:
+            print(f"\n❌ Failed to create {filepath.name} from {first_dest.name}: {e}")
+            continue
+        print(f"\n✅ {filepath.name} deduped from {first_dest.name} (same URL)")
+        success_count += 1
     
     print(f"\n📊 Download Summary:")
     print(f"   Successful: {success_count}/{total_count}")
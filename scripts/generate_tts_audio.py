@@ -7,8 +7,8 @@ It replaces the previous tone-based audio files with clear, spoken audio cues.
 
 Requirements:
 - pyttsx3 (cross-platform TTS)
-- pydub (audio processing)
-- numpy (audio manipulation)
+- numpy (audio processing)
+- pydub (optional, decodes non-WAV TTS output via ffmpeg)
 
 Install dependencies:
 pip install pyttsx3 pydub numpy
@@ -17,17 +17,60 @@ Usage:
 python generate_tts_audio.py
 """
 
+import functools
 import os
+import queue
 import sys
 import pyttsx3
 import tempfile
-from pathlib import Path
-from pydub import AudioSegment
-from pydub.effects import normalize
+import threading
 import argparse
 
+from _util import AUDIO_CUES, TEST_AUDIO_CUE, ensure_dir, log, print_generated_files
+from audio_processing import (
+    DEFAULT_FRAME_RATE,
+    duration_seconds,
+    load_audio,
+    process_cue,
+    remove_temp_file,
+    write_wav,
+)
+
+# Clear, professional voices in order of preference; falls back to the first available
+_PREFERRED_VOICES = ('zira', 'samantha', 'victoria', 'female')
+
+def _pick_voice(voices):
+    """Return the most preferred installed voice, or the first one if none match."""
+    return next(
+        (voice for token in _PREFERRED_VOICES for voice in voices if token in voice.name.lower()),
+        voices[0],
+    )
+
+def _has_audio(path):
+    """Whether the TTS driver actually wrote output to path."""
+    return os.path.exists(path) and os.path.getsize(path) > 0
+
+@functools.lru_cache(maxsize=1)
+def _make_engine():
+    """
+    Initialize the pyttsx3 engine once per process.
+    
+    pyttsx3 only keeps engines in a weak cache, so holding the reference here
+    stops the native driver from being reloaded for every generator instance.
+    Rate and volume are per instance and applied by
+    TTSAudioGenerator._apply_settings() before each run.
+    """
+    return pyttsx3.init()
+
+@functools.lru_cache(maxsize=1)
+def _voice_id():
+    """Id of the preferred installed voice, looked up once (or None if there are no voices)."""
+    voices = _make_engine().getProperty('voices')
+    return _pick_voice(voices).id if voices else None
+
 class TTSAudioGenerator:
-    def __init__(self, output_dir="assets/audio", voice_rate=180, voice_volume=0.8):
+    def __init__(self, output_dir="assets/audio", voice_rate=180, voice_volume=0.8,
+                 sample_rate=DEFAULT_FRAME_RATE):
         """
         Initialize the TTS audio generator.
         
@@ -35,144 +78,172 @@ class TTSAudioGenerator:
             output_dir: Directory to save generated audio files
             voice_rate: Speech rate (words per minute)
             voice_volume: Voice volume (0.0 to 1.0)
+            sample_rate: Sample rate of the generated files in Hz
         """
-        self.output_dir = Path(output_dir)
-        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.output_dir = ensure_dir(output_dir)
+        self.sample_rate = sample_rate
+        self.voice_rate = voice_rate
+        self.voice_volume = voice_volume
         
-        # Initialize TTS engine
-        self.engine = pyttsx3.init()
+        # Initialize TTS engine (shared across instances)
+        self.engine = _make_engine()
         
-        # Configure voice properties
-        self.engine.setProperty('rate', voice_rate)
-        self.engine.setProperty('volume', voice_volume)
-        
-        # Try to set a clear, professional voice
-        voices = self.engine.getProperty('voices')
-        if voices:
-            # Prefer female voices for clarity, fallback to first available
-            for voice in voices:
-                if 'female' in voice.name.lower() or 'zira' in voice.name.lower():
-                    self.engine.setProperty('voice', voice.id)
-                    break
-            else:
-                self.engine.setProperty('voice', voices[0].id)
-        
-        print(f"Using voice: {self.engine.getProperty('voice')}")
+        print(f"Using voice: {_voice_id() or self.engine.getProperty('voice')}")
         print(f"Speech rate: {voice_rate} WPM")
         print(f"Volume: {voice_volume}")
+        print(f"Sample rate: {sample_rate} Hz")
     
-    def generate_audio_file(self, text, filename, duration_limit=None):
+    def _new_temp_path(self):
+        """Reserve a temporary .wav path for raw TTS output."""
+        with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_file:
+            return temp_file.name
+    
+    def _apply_settings(self):
+        """Set the voice and this generator's rate and volume on the shared engine before queueing cues."""
+        voice_id = _voice_id()
+        if voice_id:
+            self.engine.setProperty('voice', voice_id)
+        self.engine.setProperty('rate', self.voice_rate)
+        self.engine.setProperty('volume', self.voice_volume)
+    
+    def _enqueue(self, text, temp_path, name=None):
+        """Queue text for synthesis into temp_path; nothing is spoken until runAndWait()."""
+        self.engine.save_to_file(text, temp_path, name)
+    
+    def _postprocess_worker(self, work):
+        """Post-process cues from the work queue until a None sentinel arrives."""
+        while True:
+            cue = work.get()
+            try:
+                if cue is None:
+                    return
+                text, temp_path, filename, duration_limit = cue
+                log(f"Processing: {filename}.wav")
+                self._postprocess(text, temp_path, filename, duration_limit)
+            finally:
+                work.task_done()
+    
+    def _postprocess(self, text, temp_path, filename, duration_limit=None):
         """
-        Generate an audio file from text using TTS.
+        Turn raw TTS output into the final cue and remove the temporary file.
         
         Args:
-            text: Text to convert to speech
+            text: Text that was synthesized (for error messages)
+            temp_path: Path of the raw TTS output
             filename: Output filename (without extension)
             duration_limit: Maximum duration in seconds (optional)
         """
-        print(f"Generating: {filename}.wav - '{text}'")
-        
-        # Create temporary file for TTS output
-        with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_file:
-            temp_path = temp_file.name
-        
         try:
-            # Generate TTS audio
-            self.engine.save_to_file(text, temp_path)
-            self.engine.runAndWait()
-            
             # Check if file was created and has content
-            if not os.path.exists(temp_path) or os.path.getsize(temp_path) == 0:
-                print(f"  Error: TTS failed to generate audio for '{text}'")
+            if not _has_audio(temp_path):
+                log(f"  Error: TTS failed to generate audio for '{text}'")
                 return
             
-            # Try to load and process the audio
+            # Load the audio; WAV is parsed in-process and only other
+            # formats fall back to pydub/ffmpeg
             try:
-                audio = AudioSegment.from_wav(temp_path)
+                samples, frame_rate = load_audio(temp_path)
             except Exception as e:
-                print(f"  Error loading audio: {e}")
-                # Try alternative approach - use raw audio data
-                try:
-                    audio = AudioSegment.from_file(temp_path)
-                except Exception as e2:
-                    print(f"  Error with alternative loading: {e2}")
-                    return
-            
-            # Normalize audio levels
-            audio = normalize(audio)
-            
-            # Apply duration limit if specified
-            if duration_limit and len(audio) > duration_limit * 1000:
-                audio = audio[:duration_limit * 1000]
-                print(f"  Truncated to {duration_limit}s")
+                log(f"  Error loading audio: {e}")
+                return
             
-            # Convert to mono and set sample rate
-            audio = audio.set_channels(1)  # Mono
-            audio = audio.set_frame_rate(44100)  # 44.1 kHz
+            if duration_limit and len(samples) > duration_limit * frame_rate:
+                log(f"  Truncated to {duration_limit}s")
             
-            # Apply fade in/out for smoother playback
-            if len(audio) > 200:  # Only if long enough
-                audio = audio.fade_in(50).fade_out(50)
+            # Normalize, trim, downmix to mono, resample and fade
+            cue = process_cue(samples, frame_rate, duration_limit, self.sample_rate)
             
             # Save final audio file
             output_path = self.output_dir / f"{filename}.wav"
-            audio.export(output_path, format="wav")
+            write_wav(output_path, cue, self.sample_rate)
             
-            print(f"  Saved: {output_path} ({len(audio)/1000:.1f}s)")
+            log(f"  Saved: {output_path} ({duration_seconds(cue, self.sample_rate):.1f}s)")
             
         except Exception as e:
-            print(f"  Error generating audio: {e}")
+            log(f"  Error generating audio: {e}")
         finally:
             # Clean up temporary file
-            if os.path.exists(temp_path):
-                os.unlink(temp_path)
+            remove_temp_file(temp_path)
+    
+    def generate_audio_file(self, text, filename, duration_limit=None):
+        """
+        Generate an audio file from text using TTS.
+        
+        Args:
+            text: Text to convert to speech
+            filename: Output filename (without extension)
+            duration_limit: Maximum duration in seconds (optional)
+        """
+        log(f"Generating: {filename}.wav - '{text}'")
+        
+        temp_path = self._new_temp_path()
+        try:
+            self._apply_settings()
+            self._enqueue(text, temp_path)
+            self.engine.runAndWait()
+        except Exception as e:
+            log(f"  Error generating audio: {e}")
+        self._postprocess(text, temp_path, filename, duration_limit)
     
     def generate_all_audio_cues(self):
         """Generate all required audio cues for the StrikeSense timer."""
         
-        # Define all audio cues with their text and optional duration limits
-        audio_cues = [
-            # Core timer events
-            ("Round start", "round_start", 1.0),
-            ("Round end", "round_end", 1.0),
-            ("Timer complete", "timer_complete", 1.5),
-            
-            # Work/Rest periods
-            ("Work period", "work_start", 1.0),
-            ("Rest period", "rest_start", 1.0),
-            
-            # Timer controls
-            ("Timer paused", "pause", 0.8),
-            ("Timer resumed", "resume", 0.8),
-            
-            # Warnings and countdown
-            ("Warning", "warning", 0.8),
-            ("Countdown", "countdown", 0.5),
-        ]
+        log("Generating TTS audio files for StrikeSense timer...")
+        log("=" * 50)
         
-        print("Generating TTS audio files for StrikeSense timer...")
-        print("=" * 50)
+        # Queue every cue and run the engine once; starting the driver loop
+        # per cue costs far more than synthesizing these short phrases.
+        # Each cue is handed to a post-processing thread as soon as the engine
+        # reports it finished, so processing overlaps the remaining synthesis.
+        # Not every driver can queue file output: espeak (pyttsx3 2.99 on
+        # Linux) reports each utterance finished but only writes the last
+        # file, so cues left without output are synthesized again one by one.
+        work = queue.Queue()
+        consumer = threading.Thread(target=self._postprocess_worker, args=(work,))
+        consumer.start()
         
-        for text, filename, duration_limit in audio_cues:
-            self.generate_audio_file(text, filename, duration_limit)
+        pending = {}
         
-        print("=" * 50)
-        print("All audio files generated successfully!")
+        def on_finished(name, completed):
+            cue = pending.get(name)
+            if cue is not None and _has_audio(cue[1]):
+                work.put(pending.pop(name))
         
-        # List generated files
-        print("\nGenerated files:")
-        for file_path in sorted(self.output_dir.glob("*.wav")):
-            file_size = file_path.stat().st_size
-            print(f"  {file_path.name} ({file_size:,} bytes)")
+        token = self.engine.connect('finished-utterance', on_finished)
+        try:
+            self._apply_settings()
+            for text, filename, duration_limit in AUDIO_CUES:
+                log(f"Queued: {filename}.wav - '{text}'")
+                temp_path = self._new_temp_path()
+                pending[filename] = (text, temp_path, filename, duration_limit)
+                self._enqueue(text, temp_path, filename)
+            self.engine.runAndWait()
+            
+            for text, temp_path, filename, _ in list(pending.values()):
+                if not _has_audio(temp_path):
+                    log(f"Retrying: {filename}.wav - '{text}'")
+                    self._enqueue(text, temp_path, filename)
+                    self.engine.runAndWait()
+        except Exception as e:
+            log(f"  Error generating audio: {e}")
+        finally:
+            self.engine.disconnect(token)
+            # Hand over anything the driver didn't report, then stop the consumer
+            for cue in list(pending.values()):
+                work.put(cue)
+            pending.clear()
+            work.put(None)
+            consumer.join()
+        
+        log("=" * 50)
+        log("All audio files generated successfully!")
+        
+        print_generated_files(self.output_dir)
     
     def test_audio_quality(self):
         """Generate a test audio file to verify quality."""
         print("\nGenerating test audio file...")
-        self.generate_audio_file(
-            "StrikeSense timer audio test. All systems working correctly.",
-            "test_audio",
-            3.0
-        )
+        self.generate_audio_file(*TEST_AUDIO_CUE)
         print("Test audio generated. Play 'test_audio.wav' to verify quality.")
 
 def main():
@@ -183,6 +254,8 @@ def main():
                        help="Speech rate in words per minute")
     parser.add_argument("--volume", type=float, default=0.8,
                        help="Voice volume (0.0 to 1.0)")
+    parser.add_argument("--sample-rate", type=int, default=DEFAULT_FRAME_RATE,
+                       help="Sample rate of the generated files in Hz (e.g. 16000, 22050, 44100)")
     parser.add_argument("--test-only", action="store_true",
                        help="Generate only test audio file")
     
@@ -193,7 +266,8 @@ def main():
         generator = TTSAudioGenerator(
             output_dir=args.output_dir,
             voice_rate=args.rate,
-            voice_volume=args.volume
+            voice_volume=args.volume,
+            sample_rate=args.sample_rate
         )
         
         if args.test_only:
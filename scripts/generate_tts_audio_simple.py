@@ -10,15 +10,27 @@ python3 generate_tts_audio_simple.py
 """
 
 import os
+import queue
 import subprocess
+import sys
 import tempfile
-from pathlib import Path
-from pydub import AudioSegment
-from pydub.effects import normalize
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import argparse
 
+from _util import AUDIO_CUES, TEST_AUDIO_CUE, ensure_dir, log, print_generated_files
+from audio_processing import (
+    DEFAULT_FRAME_RATE,
+    duration_seconds,
+    load_audio,
+    process_cue,
+    remove_temp_file,
+    write_wav,
+)
+
 class SimpleTTSAudioGenerator:
-    def __init__(self, output_dir="assets/audio", voice="Samantha", rate=200):
+    def __init__(self, output_dir="assets/audio", voice="Samantha", rate=200,
+                 sample_rate=DEFAULT_FRAME_RATE):
         """
         Initialize the simple TTS audio generator.
         
@@ -26,132 +38,188 @@ class SimpleTTSAudioGenerator:
             output_dir: Directory to save generated audio files
             voice: macOS voice to use (e.g., 'Samantha', 'Alex', 'Victoria')
             rate: Speech rate (words per minute)
+            sample_rate: Sample rate of the generated files in Hz
         """
-        self.output_dir = Path(output_dir)
-        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.output_dir = ensure_dir(output_dir)
+        self.sample_rate = sample_rate
         self.voice = voice
         self.rate = rate
         
         print(f"Using voice: {voice}")
         print(f"Speech rate: {rate} WPM")
+        print(f"Sample rate: {sample_rate} Hz")
     
-    def generate_audio_file(self, text, filename, duration_limit=None):
+    def _synthesize(self, text):
         """
-        Generate an audio file from text using macOS 'say' command.
+        Run 'say' and decode the spoken text.
         
-        Args:
-            text: Text to convert to speech
-            filename: Output filename (without extension)
-            duration_limit: Maximum duration in seconds (optional)
+        'say' is asked for mono 16-bit PCM WAV at the output sample rate, so
+        the audio decodes without ffmpeg and needs no resampling. It is piped
+        back over stdout so it never touches disk; if 'say' cannot write to
+        the pipe, falls back to a temporary file.
+        
+        Returns:
+            Tuple of (samples, frame_rate) as returned by load_audio,
+            or None if synthesis failed
         """
-        print(f"Generating: {filename}.wav - '{text}'")
+        base_cmd = [
+            'say',
+            '-v', self.voice,
+            '-r', str(self.rate),
+            '--file-format=WAVE',
+            f'--data-format=LEI16@{self.sample_rate}',
+        ]
+        
+        cmd = base_cmd + ['-o', '/dev/stdout', text]
+        result = subprocess.run(cmd, capture_output=True)
+        if result.returncode != 0:
+            log(f"  Error: say command failed: {result.stderr.decode(errors='replace')}")
+            return None
+        
+        if result.stdout:
+            try:
+                samples, frame_rate = load_audio(result.stdout)
+                if len(samples) > 0:
+                    return samples, frame_rate
+            except Exception:
+                pass
         
+        return self._synthesize_to_file(base_cmd, text)
+    
+    def _synthesize_to_file(self, base_cmd, text):
+        """Fallback for _synthesize that lets 'say' write a temporary file."""
         # Create temporary file for TTS output
-        with tempfile.NamedTemporaryFile(suffix='.aiff', delete=False) as temp_file:
+        with tempfile.NamedTemporaryFile(suffix='.wav', delete=False) as temp_file:
             temp_path = temp_file.name
         
         try:
-            # Use macOS 'say' command to generate audio
-            cmd = [
-                'say',
-                '-v', self.voice,
-                '-r', str(self.rate),
-                '-o', temp_path,
-                text
-            ]
-            
-            result = subprocess.run(cmd, capture_output=True, text=True)
+            result = subprocess.run(base_cmd + ['-o', temp_path, text], capture_output=True, text=True)
             if result.returncode != 0:
-                print(f"  Error: say command failed: {result.stderr}")
-                return
+                log(f"  Error: say command failed: {result.stderr}")
+                return None
             
             # Check if file was created and has content
             if not os.path.exists(temp_path) or os.path.getsize(temp_path) == 0:
-                print(f"  Error: TTS failed to generate audio for '{text}'")
-                return
+                log(f"  Error: TTS failed to generate audio for '{text}'")
+                return None
             
-            # Load and process the audio
+            # Load the audio
             try:
-                audio = AudioSegment.from_file(temp_path)
+                return load_audio(temp_path)
             except Exception as e:
-                print(f"  Error loading audio: {e}")
-                return
-            
-            # Normalize audio levels
-            audio = normalize(audio)
-            
-            # Apply duration limit if specified
-            if duration_limit and len(audio) > duration_limit * 1000:
-                audio = audio[:duration_limit * 1000]
-                print(f"  Truncated to {duration_limit}s")
-            
-            # Convert to mono and set sample rate
-            audio = audio.set_channels(1)  # Mono
-            audio = audio.set_frame_rate(44100)  # 44.1 kHz
-            
-            # Apply fade in/out for smoother playback
-            if len(audio) > 200:  # Only if long enough
-                audio = audio.fade_in(50).fade_out(50)
-            
-            # Save final audio file
-            output_path = self.output_dir / f"{filename}.wav"
-            audio.export(output_path, format="wav")
-            
-            print(f"  Saved: {output_path} ({len(audio)/1000:.1f}s)")
-            
-        except Exception as e:
-            print(f"  Error generating audio: {e}")
+                log(f"  Error loading audio: {e}")
+                return None
         finally:
             # Clean up temporary file
-            if os.path.exists(temp_path):
-                os.unlink(temp_path)
+            remove_temp_file(temp_path)
     
-    def generate_all_audio_cues(self):
-        """Generate all required audio cues for the StrikeSense timer."""
+    def _write_cue(self, filename, decoded, duration_limit=None):
+        """
+        Post-process decoded speech and save it as the final cue.
         
-        # Define all audio cues with their text and optional duration limits
-        audio_cues = [
-            # Core timer events
-            ("Round start", "round_start", 1.0),
-            ("Round end", "round_end", 1.0),
-            ("Timer complete", "timer_complete", 1.5),
-            
-            # Work/Rest periods
-            ("Work period", "work_start", 1.0),
-            ("Rest period", "rest_start", 1.0),
-            
-            # Timer controls
-            ("Timer paused", "pause", 0.8),
-            ("Timer resumed", "resume", 0.8),
+        Args:
+            filename: Output filename (without extension)
+            decoded: Tuple of (samples, frame_rate) from _synthesize
+            duration_limit: Maximum duration in seconds (optional)
+        
+        Returns:
+            Path of the saved audio file
+        """
+        samples, frame_rate = decoded
+        
+        if duration_limit and len(samples) > duration_limit * frame_rate:
+            log(f"  Truncated {filename}.wav to {duration_limit}s")
+        
+        # Normalize, trim, downmix to mono, resample and fade
+        cue = process_cue(samples, frame_rate, duration_limit, self.sample_rate)
+        
+        # Save final audio file
+        output_path = self.output_dir / f"{filename}.wav"
+        write_wav(output_path, cue, self.sample_rate)
+        
+        log(f"  Saved: {output_path} ({duration_seconds(cue, self.sample_rate):.1f}s)")
+        return output_path
+    
+    def _write_worker(self, work):
+        """Write cues from the work queue until a None sentinel arrives."""
+        while True:
+            item = work.get()
+            try:
+                if item is None:
+                    return
+                filename, decoded, duration_limit = item
+                self._write_cue(filename, decoded, duration_limit)
+            except Exception as e:
+                log(f"  Error generating audio: {e}")
+            finally:
+                work.task_done()
+    
+    def generate_audio_file(self, text, filename, duration_limit=None):
+        """
+        Generate an audio file from text using macOS 'say' command.
+        
+        Args:
+            text: Text to convert to speech
+            filename: Output filename (without extension)
+            duration_limit: Maximum duration in seconds (optional)
+        
+        Returns:
+            Path of the saved audio file, or None if generation failed
+        """
+        log(f"Generating: {filename}.wav - '{text}'")
+        
+        try:
+            decoded = self._synthesize(text)
+            if decoded is None:
+                return None
+            return self._write_cue(filename, decoded, duration_limit)
             
-            # Warnings and countdown
-            ("Warning", "warning", 0.8),
-            ("Countdown", "countdown", 0.5),
-        ]
+        except Exception as e:
+            log(f"  Error generating audio: {e}")
+            return None
+    
+    def generate_all_audio_cues(self):
+        """Generate all required audio cues for the StrikeSense timer."""
         
         print("Generating TTS audio files for StrikeSense timer...")
         print("=" * 50)
         
-        for text, filename, duration_limit in audio_cues:
-            self.generate_audio_file(text, filename, duration_limit)
+        # Pipeline the work: 'say' runs for several cues side by side while a
+        # writer thread post-processes and saves each one as it arrives
+        work = queue.Queue(maxsize=4)
+        writer = threading.Thread(target=self._write_worker, args=(work,))
+        writer.start()
+        
+        try:
+            max_workers = min(len(AUDIO_CUES), os.cpu_count() or 1)
+            with ThreadPoolExecutor(max_workers=max_workers) as executor:
+                futures = {}
+                for text, filename, duration_limit in AUDIO_CUES:
+                    log(f"Generating: {filename}.wav - '{text}'")
+                    futures[executor.submit(self._synthesize, text)] = (filename, duration_limit)
+                
+                for future in as_completed(futures):
+                    filename, duration_limit = futures[future]
+                    try:
+                        decoded = future.result()
+                    except Exception as e:
+                        log(f"  Error generating {filename}.wav: {e}")
+                        continue
+                    if decoded is not None:
+                        work.put((filename, decoded, duration_limit))
+        finally:
+            work.put(None)
+            writer.join()
         
         print("=" * 50)
         print("All audio files generated successfully!")
         
-        # List generated files
-        print("\nGenerated files:")
-        for file_path in sorted(self.output_dir.glob("*.wav")):
-            file_size = file_path.stat().st_size
-            print(f"  {file_path.name} ({file_size:,} bytes)")
+        print_generated_files(self.output_dir)
     
     def test_audio_quality(self):
         """Generate a test audio file to verify quality."""
         print("\nGenerating test audio file...")
-        self.generate_audio_file(
-            "StrikeSense timer audio test. All systems working correctly.",
-            "test_audio",
-            3.0
-        )
+        self.generate_audio_file(*TEST_AUDIO_CUE)
         print("Test audio generated. Play 'test_audio.wav' to verify quality.")
 
 def main():
@@ -162,6 +230,8 @@ def main():
                        help="macOS voice to use (e.g., Samantha, Alex, Victoria)")
     parser.add_argument("--rate", type=int, default=200,
                        help="Speech rate in words per minute")
+    parser.add_argument("--sample-rate", type=int, default=DEFAULT_FRAME_RATE,
+                       help="Sample rate of the generated files in Hz (e.g. 16000, 22050, 44100)")
     parser.add_argument("--test-only", action="store_true",
                        help="Generate only test audio file")
     
@@ -172,7 +242,8 @@ def main():
         generator = SimpleTTSAudioGenerator(
             output_dir=args.output_dir,
             voice=args.voice,
-            rate=args.rate
+            rate=args.rate,
+            sample_rate=args.sample_rate
         )
         
         if args.test_only:
@@ -184,7 +255,7 @@ def main():
     except Exception as e:
         print(f"Error: {e}")
         print("\nMake sure you have the required dependencies installed:")
-        print("pip install pydub numpy")
+        print("pip install numpy")
         sys.exit(1)
 
 if __name__ == "__main__":